@@ -1,5 +1,6 @@
+from __future__ import annotations
+
 import streamlit as st
-import pandas as pd
 import os
 from datetime import datetime
 import json
@@ -9,7 +10,12 @@ import traceback
 import re
 from functools import lru_cache
 import unicodedata
-from typing import Dict, Any, Optional, Union, List
+import threading
+from typing import Dict, Any, Optional, Union, List, TYPE_CHECKING
+
+# pandas ağır bir import; yalnızca ihtiyaç duyulan fonksiyonlarda yüklenir
+if TYPE_CHECKING:
+    import pandas as pd
 
 # View fonksiyonlarını import et
 from views import musteri_ekle_view, musteri_sil_view, veri_yukle_view, analiz_yap_view
@@ -28,6 +34,8 @@ class FileHandler:
     @staticmethod
     def read_excel_file(file) -> Optional[pd.DataFrame]:
         """Excel dosyalarını oku (XLS, XLSX)"""
+        import pandas as pd
+        
         try:
             # Dosyayı başa sar
             file.seek(0)
@@ -85,6 +93,8 @@ class FileHandler:
     @staticmethod
     def save_excel_file(df: pd.DataFrame, output_path: str) -> None:
         """Excel dosyasını kaydet"""
+        import pandas as pd
+        
         try:
             with pd.ExcelWriter(output_path, engine='openpyxl', mode='w') as writer:
                 df.to_excel(writer, index=False, sheet_name='Veri')
@@ -109,6 +119,8 @@ class FileHandler:
     @staticmethod
     def read_csv_file(file) -> pd.DataFrame:
         """CSV dosyalarını oku"""
+        import pandas as pd
+        
         try:
             # Dosyayı başa sar
             file.seek(0)
@@ -119,52 +131,156 @@ class FileHandler:
 
 class DataProcessor:
     """Veri işleme ve analiz sınıfı"""
-    
+
+    RISK_SEVIYELERI = (
+        (8, "Çok Yüksek Risk"),
+        (5, "Yüksek Risk"),
+        (3, "Orta Risk"),
+        (0, "Düşük Risk")
+    )
+    OZEL_GRUP_PUANI = 3
+    KATEGORI_PUANI = 1
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def kural_setini_yukle(dosya: str = "anahtar_kelimeler.json") -> Dict[str, Any]:
+        """Anahtar kelimeleri bir kez okuyup derlenmiş kural setini döndür"""
+        with open(dosya, 'r', encoding='utf-8') as f:
+            anahtar_kelimeler = json.load(f)
+        kelime_gruplari = anahtar_kelimeler.pop("Özel Gruplar", [])
+
+        ozel_gruplar = tuple(re.compile(grup, re.IGNORECASE) for grup in kelime_gruplari)
+        kategoriler = tuple(
+            (kategori, tuple(re.compile(r, re.IGNORECASE) for r in regex_listesi))
+            for kategori, regex_listesi in anahtar_kelimeler.items()
+        )
+
+        return {"ozel_gruplar": ozel_gruplar, "kategoriler": kategoriler}
+
+    @staticmethod
+    def risk_seviyesi(risk_skoru: int) -> str:
+        """Risk skoruna karşılık gelen uyarı seviyesini döndür"""
+        return next(
+            (seviye for esik, seviye in DataProcessor.RISK_SEVIYELERI if risk_skoru >= esik),
+            "Düşük Risk"
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=10000)
+    def risk_skoru_hesapla(fatura_metni: str, erken_cikis: bool = False) -> Dict[str, Any]:
+        """Hızlı yol: risk skoru, uyarı seviyesi ve eşleşen kategori adlarını hesapla
+
+        Desenler ve karakter aralıkları hesaplanmaz; bunlar için eslesmeleri_acikla
+        kullanılır. erken_cikis=True iken skor "Çok Yüksek Risk" eşiğine ulaşınca
+        tarama durur; seviye yine doğrudur ancak skor bir alt sınırdır ve
+        kategoriler eksik olabilir.
+        """
+        kurallar = DataProcessor.kural_setini_yukle()
+        fatura_metni = str(fatura_metni).lower()
+        risk_skoru = 0
+        kategoriler = []
+
+        esik = DataProcessor.RISK_SEVIYELERI[0][0]
+        desen_gruplari = [("Özel Grup", kurallar["ozel_gruplar"], DataProcessor.OZEL_GRUP_PUANI)]
+        desen_gruplari += [(kategori, regex_listesi, DataProcessor.KATEGORI_PUANI)
+                           for kategori, regex_listesi in kurallar["kategoriler"]]
+
+        def sonuc() -> Dict[str, Any]:
+            return {
+                "risk_skoru": risk_skoru,
+                "uyari_seviyesi": DataProcessor.risk_seviyesi(risk_skoru),
+                "kategoriler": tuple(kategoriler)
+            }
+
+        for kategori, regex_listesi, puan in desen_gruplari:
+            for regex in regex_listesi:
+                if regex.search(fatura_metni):
+                    if not kategoriler or kategoriler[-1] != kategori:
+                        kategoriler.append(kategori)
+                    risk_skoru += puan
+                    if erken_cikis and risk_skoru >= esik:
+                        return sonuc()
+
+        return sonuc()
+
+    @staticmethod
+    @lru_cache(maxsize=10000)
+    def risk_var_mi(fatura_metni: str) -> bool:
+        """Evet/hayır yolu: ilk eşleşen desende taramayı bitir"""
+        kurallar = DataProcessor.kural_setini_yukle()
+        fatura_metni = str(fatura_metni).lower()
+        regex_listeleri = [kurallar["ozel_gruplar"]] + [liste for _, liste in kurallar["kategoriler"]]
+        return any(regex.search(fatura_metni) for liste in regex_listeleri for regex in liste)
+
+    @staticmethod
+    @lru_cache(maxsize=1000)
+    def eslesmeleri_acikla(fatura_metni: str) -> Dict[str, Any]:
+        """Seçilen satırlar için eşleşen desenleri, kategorileri ve karakter aralıklarını döndür
+
+        Aralıklar, dönen "metin" alanındaki orijinal metne göredir.
+        """
+        kurallar = DataProcessor.kural_setini_yukle()
+        orijinal_metin = str(fatura_metni)
+
+        # lower() bazı karakterlerin uzunluğunu değiştirir ("İ" -> "i̇"); bu yüzden
+        # küçük harfli metindeki her karakterin orijinal konumu ayrıca tutulur
+        parcalar, konumlar = [], []
+        for i, karakter in enumerate(orijinal_metin):
+            kucuk = karakter.lower()
+            parcalar.append(kucuk)
+            konumlar.extend([i] * len(kucuk))
+        fatura_metni = ''.join(parcalar)
+        konumlar.append(len(orijinal_metin))
+
+        def orijinal_aralik(baslangic: int, bitis: int) -> tuple:
+            if bitis <= baslangic:
+                return (konumlar[baslangic], konumlar[baslangic])
+            return (konumlar[baslangic], konumlar[bitis - 1] + 1)
+
+        sonuc = {"metin": orijinal_metin, "risk_skoru": 0, "eslesmeler": {}}
+
+        desen_gruplari = [("Özel Grup", kurallar["ozel_gruplar"], DataProcessor.OZEL_GRUP_PUANI)]
+        desen_gruplari += [(kategori, regex_listesi, DataProcessor.KATEGORI_PUANI)
+                           for kategori, regex_listesi in kurallar["kategoriler"]]
+
+        for kategori, regex_listesi, puan in desen_gruplari:
+            for regex in regex_listesi:
+                araliklar = [orijinal_aralik(*m.span()) for m in regex.finditer(fatura_metni)]
+                if araliklar:
+                    # Kategori desenleri, detaylı raporda olduğu gibi \b'siz gösterilir
+                    desen = regex.pattern if kategori == "Özel Grup" else regex.pattern.strip(r"\b")
+                    sonuc["eslesmeler"].setdefault(kategori, []).append({
+                        "desen": desen,
+                        "araliklar": araliklar
+                    })
+                    sonuc["risk_skoru"] += puan
+
+        sonuc["uyari_seviyesi"] = DataProcessor.risk_seviyesi(sonuc["risk_skoru"])
+        return sonuc
+
     @staticmethod
     @lru_cache(maxsize=1000)
     def tevkifat_kontrol(fatura_metni: str, detayli_rapor: bool = False) -> Union[bool, Dict[str, Any]]:
         """Tevkifat riski analizi"""
         try:
-            with open("anahtar_kelimeler.json", 'r', encoding='utf-8') as f:
-                anahtar_kelimeler = json.load(f)
-                kelime_gruplari = anahtar_kelimeler.pop("Özel Gruplar", [])
-                for kategori, regex_listesi in anahtar_kelimeler.items():
-                    anahtar_kelimeler[kategori] = [re.compile(r, re.IGNORECASE) for r in regex_listesi]
+            DataProcessor.kural_setini_yukle()
         except Exception as e:
             logging.error(f"Anahtar kelimeler yükleme hatası: {str(e)}")
             return False
 
-        fatura_metni = str(fatura_metni).lower()
-        sonuc = {"risk_skoru": 0, "eslesmeler": {}}
-
-        # Kelime grupları kontrolü
-        for grup in kelime_gruplari:
-            if re.search(grup, fatura_metni, re.IGNORECASE):
-                sonuc["eslesmeler"].setdefault("Özel Grup", []).append(grup)
-                sonuc["risk_skoru"] += 3
+        if not detayli_rapor:
+            return DataProcessor.risk_var_mi(fatura_metni)
 
-        # Kategori bazlı kontrol
-        for kategori, regex_listesi in anahtar_kelimeler.items():
-            for regex in regex_listesi:
-                if regex.search(fatura_metni):
-                    sonuc["eslesmeler"].setdefault(kategori, []).append(regex.pattern.strip(r"\b"))
-                    sonuc["risk_skoru"] += 1
-
-        # Risk seviyesi belirleme
-        risk_seviyeleri = {
-            8: "Çok Yüksek Risk",
-            5: "Yüksek Risk",
-            3: "Orta Risk",
-            0: "Düşük Risk"
+        aciklama = DataProcessor.eslesmeleri_acikla(fatura_metni)
+        eslesmeler = {
+            kategori: [e["desen"] for e in liste]
+            for kategori, liste in aciklama["eslesmeler"].items()
+        }
+        return {
+            "risk_skoru": aciklama["risk_skoru"],
+            "eslesmeler": eslesmeler,
+            "uyari_seviyesi": aciklama["uyari_seviyesi"]
         }
-        
-        sonuc["uyari_seviyesi"] = next(
-            (seviye for esik, seviye in sorted(risk_seviyeleri.items(), reverse=True)
-             if sonuc["risk_skoru"] >= esik),
-            "Düşük Risk"
-        )
-
-        return sonuc if detayli_rapor else bool(sonuc["eslesmeler"])
 
 class ConfigManager:
     """Konfigürasyon yönetimi sınıfı"""
@@ -207,17 +323,30 @@ class TevkifatAnalyzer:
         self.config_manager = ConfigManager()
         self.file_handler = FileHandler()
         self.data_processor = DataProcessor()
+        # Analyzer tüm oturumlarca paylaşıldığından config değişiklikleri ve kayıt kilitlenir
+        self.config_kilidi = threading.Lock()
+
+    def musteriler(self) -> Dict[str, Dict[str, str]]:
+        """Müşteri listesinin kilit altında alınmış bir kopyasını döndür"""
+        with self.config_kilidi:
+            return {musteri_id: dict(bilgi) for musteri_id, bilgi in self.config_manager.config["musteriler"].items()}
+
+    def kayitli_mapping(self, musteri_id: str) -> Dict[str, str]:
+        """Müşterinin kayıtlı sütun eşleştirmesinin kilit altında alınmış bir kopyasını döndür"""
+        with self.config_kilidi:
+            return dict(self.config_manager.config.get("column_mappings", {}).get(musteri_id, {}))
 
     def musteri_ekle(self, musteri_adi: str) -> Optional[str]:
         """Yeni müşteri ekle"""
         try:
-            musteri_id = str(len(self.config_manager.config["musteriler"]) + 1)
-            self.config_manager.config["musteriler"][musteri_id] = {
-                "ad": musteri_adi,
-                "eklenme_tarihi": datetime.now().strftime("%Y-%m-%d")
-            }
-            Path(f"data/{musteri_id}").mkdir(exist_ok=True)
-            self.config_manager.save_config()
+            with self.config_kilidi:
+                musteri_id = str(len(self.config_manager.config["musteriler"]) + 1)
+                self.config_manager.config["musteriler"][musteri_id] = {
+                    "ad": musteri_adi,
+                    "eklenme_tarihi": datetime.now().strftime("%Y-%m-%d")
+                }
+                Path(f"data/{musteri_id}").mkdir(exist_ok=True)
+                self.config_manager.save_config()
             return musteri_id
         except Exception as e:
             logging.error(f"Müşteri ekleme hatası: {str(e)}")
@@ -226,10 +355,11 @@ class TevkifatAnalyzer:
     def musteri_sil(self, musteri_id: str) -> bool:
         """Müşteri sil"""
         try:
-            del self.config_manager.config["musteriler"][musteri_id]
-            if musteri_id in self.config_manager.config["column_mappings"]:
-                del self.config_manager.config["column_mappings"][musteri_id]
-            self.config_manager.save_config()
+            with self.config_kilidi:
+                del self.config_manager.config["musteriler"][musteri_id]
+                if musteri_id in self.config_manager.config["column_mappings"]:
+                    del self.config_manager.config["column_mappings"][musteri_id]
+                self.config_manager.save_config()
             return True
         except Exception as e:
             logging.error(f"Müşteri silme hatası: {str(e)}")
@@ -263,10 +393,9 @@ class TevkifatAnalyzer:
             df = self._clean_data(df)
             
             # Tevkifat analizi
-            df['tevkifat_riski'] = df['aciklama'].apply(self.data_processor.tevkifat_kontrol)
-            df['detayli_analiz'] = df['aciklama'].apply(
-                lambda x: self.data_processor.tevkifat_kontrol(x, detayli_rapor=True)
-            )
+            df['detayli_analiz'] = df['aciklama'].apply(self.data_processor.risk_skoru_hesapla)
+            df['tevkifat_riski'] = df['detayli_analiz'].apply(lambda x: x['risk_skoru'] > 0)
+            df['Eşleşen Kategoriler'] = df['detayli_analiz'].apply(lambda x: ', '.join(x['kategoriler']))
 
             # Dosyayı kaydet
             output_path = f"data/{musteri_id}/{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.name}"
@@ -276,8 +405,9 @@ class TevkifatAnalyzer:
             self.file_handler.save_excel_file(df, output_path)
             
             # Mapping'i kaydet
-            self.config_manager.config["column_mappings"][musteri_id] = mapping
-            self.config_manager.save_config()
+            with self.config_kilidi:
+                self.config_manager.config["column_mappings"][musteri_id] = mapping
+                self.config_manager.save_config()
             
             return df
 
@@ -287,6 +417,8 @@ class TevkifatAnalyzer:
 
     def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Veri temizleme ve dönüştürme"""
+        import pandas as pd
+        
         try:
             # Tarih sütununu düzenle
             df['tarih'] = pd.to_datetime(df['tarih'], format='mixed')
@@ -309,6 +441,8 @@ class TevkifatAnalyzer:
 
     def analiz_yap(self, musteri_id: str, baslangic_tarih: datetime, bitis_tarih: datetime) -> Optional[pd.DataFrame]:
         """Tevkifat analizi yap"""
+        import pandas as pd
+        
         try:
             musteri_klasoru = f"data/{musteri_id}"
             if not os.path.exists(musteri_klasoru):
@@ -358,29 +492,13 @@ class TevkifatAnalyzer:
             # Tevkifat analizi için gerekli sütunu kullan
             aciklama_col = next(col for col, mapped in column_mapping.items() if mapped == 'aciklama')
             
-            # Önce tevkifat_riski sütununu ekle
-            filtered_df['tevkifat_riski'] = filtered_df[aciklama_col].apply(
-                lambda x: bool(self.data_processor.tevkifat_kontrol(x, detayli_rapor=True))
-            )
+            # Hızlı yol: skor, seviye ve kategori adları; desenler yalnızca fatura detayında hesaplanır
+            analiz_sonuclari = filtered_df[aciklama_col].apply(self.data_processor.risk_skoru_hesapla)
+            filtered_df['tevkifat_riski'] = analiz_sonuclari.apply(lambda x: x['risk_skoru'] > 0)
+            filtered_df['Risk Seviyesi'] = analiz_sonuclari.apply(lambda x: x['uyari_seviyesi'])
+            filtered_df['Risk Skoru'] = analiz_sonuclari.apply(lambda x: x['risk_skoru'])
             
-            # Detaylı analiz sonuçlarını ekle
-            analiz_sonuclari = filtered_df[aciklama_col].apply(
-                lambda x: self.data_processor.tevkifat_kontrol(x, detayli_rapor=True)
-            )
-            
-            # Analiz sonuçlarını ayrı sütunlara ekle
-            def extract_risk_info(x):
-                if isinstance(x, dict):
-                    return pd.Series({
-                        'Risk Seviyesi': x.get('uyari_seviyesi', ''),
-                        'Risk Skoru': x.get('risk_skoru', 0),
-                        'Eşleşen Kategoriler': ', '.join(x.get('eslesmeler', {}).keys())
-                    })
-                return pd.Series({'Risk Seviyesi': '', 'Risk Skoru': 0, 'Eşleşen Kategoriler': ''})
-            
-            # Analiz sonuçlarını ekle
-            risk_info = analiz_sonuclari.apply(extract_risk_info)
-            filtered_df = pd.concat([filtered_df, risk_info], axis=1)
+            filtered_df['Eşleşen Kategoriler'] = analiz_sonuclari.apply(lambda x: ', '.join(x['kategoriler']))
             
             return filtered_df
             
@@ -388,11 +506,26 @@ class TevkifatAnalyzer:
             logging.error(f"Analiz hatası: {str(e)}\n{traceback.format_exc()}")
             raise
 
+@st.cache_resource
+def analyzer_getir() -> TevkifatAnalyzer:
+    """Analyzer'ı sunucu süreci başına bir kez oluştur ve kural setini arka planda derle"""
+    analyzer = TevkifatAnalyzer()
+    threading.Thread(target=_isinma, args=(analyzer,), name="tevkifat-isinma", daemon=True).start()
+    return analyzer
+
+def _isinma(analyzer: TevkifatAnalyzer) -> None:
+    """Kural setini ve pandas'ı ilk analizden önce yükle"""
+    try:
+        analyzer.data_processor.kural_setini_yukle()
+        import pandas
+    except Exception as e:
+        logging.error(f"Isınma hatası: {str(e)}")
+
 def main():
     st.set_page_config(page_title="Tevkifat Analiz Sistemi", layout="wide")
     st.title("Tevkifat Analiz Sistemi")
     
-    analyzer = TevkifatAnalyzer()
+    analyzer = analyzer_getir()
     
     # Debug modu
     with st.sidebar:
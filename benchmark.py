@@ -0,0 +1,131 @@
+# benchmark.py
+"""Başlangıç ve yeniden çalıştırma (rerun) maliyetlerini ölçer.
+
+Kullanım:
+    python benchmark.py [--musteri-sayisi 200] [--rerun 10]
+
+Ölçümler geçici bir çalışma klasöründe yapılır; gerçek config.json ve data/
+klasörüne dokunulmaz. Bütçe aşılırsa çıkış kodu 1 olur.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+PROJE_KLASORU = os.path.dirname(os.path.abspath(__file__))
+
+# Milisaniye cinsinden bütçeler; gözlenen sürelerin yaklaşık 3 katı
+BUTCE_MS = {
+    "app import (soğuk)": 1100,
+    "kural seti derleme": 150,
+    "ilk çalıştırma": 900,
+    "rerun (medyan)": 150,
+}
+
+def _calisma_klasoru_hazirla(musteri_sayisi: int) -> str:
+    """Kural dosyası ve sahte müşterilerle geçici çalışma klasörü oluştur"""
+    klasor = tempfile.mkdtemp(prefix="tevkifat_bench_")
+    shutil.copy(os.path.join(PROJE_KLASORU, "anahtar_kelimeler.json"), klasor)
+    config = {
+        "musteriler": {
+            str(i): {"ad": f"Müşteri {i}", "eklenme_tarihi": "2024-01-01"}
+            for i in range(1, musteri_sayisi + 1)
+        },
+        "column_mappings": {}
+    }
+    with open(os.path.join(klasor, "config.json"), 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+    return klasor
+
+def import_suresi() -> float:
+    """Yeni bir yorumlayıcıda app modülünün import süresi (ms)"""
+    kod = (
+        "import sys, time; sys.path.insert(0, sys.argv[1]); "
+        "t = time.perf_counter(); import app; print((time.perf_counter() - t) * 1000)"
+    )
+    cikti = subprocess.run(
+        [sys.executable, "-c", kod, PROJE_KLASORU],
+        capture_output=True, text=True, check=True
+    )
+    return float(cikti.stdout.strip().splitlines()[-1])
+
+def kural_seti_suresi() -> float:
+    """Kural setinin soğuk derlenme süresi (ms)"""
+    from app import DataProcessor
+    DataProcessor.kural_setini_yukle.cache_clear()
+    t = time.perf_counter()
+    DataProcessor.kural_setini_yukle()
+    return (time.perf_counter() - t) * 1000
+
+def _uygulama_olcumu(rerun_sayisi: int) -> Dict[str, float]:
+    """AppTest ile ilk çalıştırma ve rerun süreleri (ms); yeni bir süreçte çağrılmalı"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(PROJE_KLASORU, "app.py"), default_timeout=60)
+    t = time.perf_counter()
+    at.run()
+    ilk = (time.perf_counter() - t) * 1000
+
+    sureler = []
+    for i in range(rerun_sayisi):
+        # Menüde dolaşarak her sayfanın rerun maliyetini dahil et
+        at.sidebar.radio[0].set_value(at.sidebar.radio[0].options[i % len(at.sidebar.radio[0].options)])
+        t = time.perf_counter()
+        at.run()
+        sureler.append((time.perf_counter() - t) * 1000)
+
+    return {"ilk çalıştırma": ilk, "rerun (medyan)": statistics.median(sureler)}
+
+def uygulama_sureleri(rerun_sayisi: int) -> Dict[str, float]:
+    """Streamlit uygulamasının ilk çalıştırma ve rerun süreleri (ms)
+
+    app, views ve kural seti bu süreçte zaten yüklü olduğundan ölçüm, ilk
+    çalıştırmanın gerçekten soğuk olması için yeni bir yorumlayıcıda yapılır.
+    """
+    cikti = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--alt-surec", "--rerun", str(rerun_sayisi)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(cikti.stdout.strip().splitlines()[-1])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Başlangıç ve rerun benchmark'ı")
+    parser.add_argument("--musteri-sayisi", type=int, default=200)
+    parser.add_argument("--rerun", type=int, default=10)
+    parser.add_argument("--alt-surec", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, PROJE_KLASORU)
+    if args.alt_surec:
+        # Geçerli klasör ana süreçte hazırlanan çalışma klasörüdür
+        print(json.dumps(_uygulama_olcumu(args.rerun)))
+        return 0
+
+    eski_klasor = os.getcwd()
+    klasor = _calisma_klasoru_hazirla(args.musteri_sayisi)
+    try:
+        os.chdir(klasor)
+        sonuclar = {"app import (soğuk)": import_suresi()}
+        sonuclar.update(uygulama_sureleri(args.rerun))
+        sonuclar["kural seti derleme"] = kural_seti_suresi()
+    finally:
+        os.chdir(eski_klasor)
+        shutil.rmtree(klasor, ignore_errors=True)
+
+    asim = False
+    print(f"{'Ölçüm':<22}{'Süre (ms)':>12}{'Bütçe (ms)':>12}")
+    for ad, sure in sonuclar.items():
+        butce = BUTCE_MS[ad]
+        durum = "" if sure <= butce else "  AŞIM"
+        asim = asim or sure > butce
+        print(f"{ad:<22}{sure:>12.1f}{butce:>12}{durum}")
+    return 1 if asim else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,5 @@
 # views.py
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 import os
 import logging
@@ -8,9 +7,119 @@ import traceback
 from pathlib import Path
 from typing import Dict, Any
 import json
+import html
 
 __all__ = ['musteri_ekle_view', 'musteri_sil_view', 'veri_yukle_view', 'analiz_yap_view']
 
+def _eslesmeleri_vurgula(aciklama: Dict[str, Any]) -> str:
+    """Eşleşen karakter aralıklarını <mark> ile işaretlenmiş HTML olarak döndür"""
+    metin = aciklama['metin']
+    araliklar = sorted(
+        aralik
+        for eslesmeler in aciklama['eslesmeler'].values()
+        for eslesme in eslesmeler
+        for aralik in eslesme['araliklar']
+    )
+    
+    # Çakışan aralıkları birleştir
+    birlesik = []
+    for baslangic, bitis in araliklar:
+        if birlesik and baslangic <= birlesik[-1][1]:
+            birlesik[-1][1] = max(birlesik[-1][1], bitis)
+        else:
+            birlesik.append([baslangic, bitis])
+    
+    parcalar = []
+    konum = 0
+    for baslangic, bitis in birlesik:
+        parcalar.append(html.escape(metin[konum:baslangic]))
+        parcalar.append(f"<mark>{html.escape(metin[baslangic:bitis])}</mark>")
+        konum = bitis
+    parcalar.append(html.escape(metin[konum:]))
+    return ''.join(parcalar)
+
+def _analiz_sonuclarini_goster(analyzer, detay: Dict[str, Any]) -> None:
+    """Saklanan analiz sonuçlarını ve seçilen faturanın eşleşme detayını göster"""
+    import pandas as pd
+    
+    st.subheader("Analiz Sonuçları")
+    riskli_faturalar = detay['df']
+    
+    try:
+        # Risk seviyesine göre renklendirme
+        def risk_rengi(df):
+            if 'Risk Seviyesi' not in df.columns:
+                return df
+            
+            # Boş stil matrisi oluştur
+            styles = pd.DataFrame('', index=df.index, columns=df.columns)
+            
+            # Risk seviyelerine göre stilleri uygula
+            mask_cok_yuksek = df['Risk Seviyesi'] == 'Çok Yüksek Risk'
+            mask_yuksek = df['Risk Seviyesi'] == 'Yüksek Risk'
+            mask_orta = df['Risk Seviyesi'] == 'Orta Risk'
+            
+            # Tüm sütunlara stil uygula
+            for col in df.columns:
+                styles.loc[mask_cok_yuksek, col] = 'background-color: red; color: white'
+                styles.loc[mask_yuksek, col] = 'background-color: orange'
+                styles.loc[mask_orta, col] = 'background-color: yellow'
+            
+            return styles
+        
+        # Stil uygula ve göster
+        styled_df = riskli_faturalar.style.apply(risk_rengi, axis=None)
+        
+        # Streamlit dataframe gösterimini genişlet
+        st.dataframe(
+            styled_df,
+            use_container_width=True,
+            height=600
+        )
+    except Exception as e:
+        st.error(f"Stil uygulama hatası: {str(e)}")
+        # Hata durumunda stili olmadan göster
+        st.dataframe(riskli_faturalar, use_container_width=True)
+    
+    # Tüm sütunları göster seçeneği
+    if st.checkbox("Tüm veriyi tablo olarak göster"):
+        st.write("Tüm Veriler:")
+        # Görüntüleme ayarları yalnızca bu tablo için geçerli
+        with pd.option_context('display.max_columns', None,
+                               'display.max_rows', None,
+                               'display.width', None,
+                               'display.max_colwidth', None):
+            tablo_html = riskli_faturalar.to_html(index=False)
+        st.write(tablo_html, unsafe_allow_html=True)
+    
+    # İndirme butonu
+    if os.path.exists(detay['output']):
+        with open(detay['output'], 'rb') as f:
+            st.download_button(
+                label="Analiz Sonuçlarını İndir",
+                data=f,
+                file_name=f"tevkifat_analizi_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+    
+    # Seçilen fatura için eşleşme detayı
+    aciklama_sutunu = detay['aciklama_sutunu']
+    if not aciklama_sutunu:
+        return
+    st.subheader("Fatura Detayı")
+    secilen_satir = st.selectbox(
+        "İncelenecek Fatura:",
+        options=list(riskli_faturalar.index),
+        format_func=lambda x: f"{x} - {str(riskli_faturalar.at[x, aciklama_sutunu])[:80]}"
+    )
+    aciklama = analyzer.data_processor.eslesmeleri_acikla(
+        riskli_faturalar.at[secilen_satir, aciklama_sutunu]
+    )
+    st.write(f"**{aciklama['uyari_seviyesi']}** (Skor: {aciklama['risk_skoru']})")
+    st.html(_eslesmeleri_vurgula(aciklama))
+    for kategori, eslesmeler in aciklama['eslesmeler'].items():
+        st.write(f"**{kategori}:** " + ', '.join(f"`{e['desen']}`" for e in eslesmeler))
+
 # Views fonksiyonları
 def musteri_ekle_view(analyzer) -> None:
     """Müşteri ekleme view fonksiyonu"""
@@ -24,7 +133,7 @@ def musteri_ekle_view(analyzer) -> None:
 def musteri_sil_view(analyzer) -> None:
     """Müşteri silme view fonksiyonu"""
     st.subheader("Müşteri Sil")
-    musteriler = analyzer.config_manager.config["musteriler"]
+    musteriler = analyzer.musteriler()
     if musteriler:
         secilen_musteri = st.selectbox(
             "Müşteri Seçin:",
@@ -39,8 +148,10 @@ def musteri_sil_view(analyzer) -> None:
 
 def veri_yukle_view(analyzer) -> None:
     """Veri yükleme view fonksiyonu"""
+    import pandas as pd
+    
     st.subheader("Veri Yükleme")
-    musteriler = analyzer.config_manager.config["musteriler"]
+    musteriler = analyzer.musteriler()
     if musteriler:
         secilen_musteri = st.selectbox(
             "Müşteri Seçin:",
@@ -75,8 +186,7 @@ def veri_yukle_view(analyzer) -> None:
                 required_columns = ['tarih', 'aciklama', 'tutar']
                 
                 # Kayıtlı mapping'i kontrol et
-                saved_mapping = analyzer.config_manager.config.get("column_mappings", {})
-                saved_mapping = saved_mapping.get(secilen_musteri, {})
+                saved_mapping = analyzer.kayitli_mapping(secilen_musteri)
                 
                 for req_col in required_columns:
                     default_value = saved_mapping.get(req_col, "")
@@ -110,15 +220,11 @@ def veri_yukle_view(analyzer) -> None:
 
 def analiz_yap_view(analyzer) -> None:
     """Analiz yapma view fonksiyonu"""
-    st.subheader("Tevkifat Analizi")
+    import pandas as pd
     
-    # Set display options for pandas
-    pd.set_option('display.max_columns', None)
-    pd.set_option('display.max_rows', None)
-    pd.set_option('display.width', None)
-    pd.set_option('display.max_colwidth', None)
+    st.subheader("Tevkifat Analizi")
     
-    musteriler = analyzer.config_manager.config["musteriler"]
+    musteriler = analyzer.musteriler()
     if musteriler:
         secilen_musteri = st.selectbox(
             "Müşteri Seçin:",
@@ -133,6 +239,7 @@ def analiz_yap_view(analyzer) -> None:
             bitis_tarih = st.date_input("Bitiş Tarihi")
         
         if st.button("Analiz Yap"):
+            st.session_state.pop('analiz_detay', None)
             try:
                 # Tarihleri datetime'a çevir
                 baslangic = datetime.combine(baslangic_tarih, datetime.min.time())
@@ -146,126 +253,92 @@ def analiz_yap_view(analyzer) -> None:
                     st.warning("Seçilen tarih aralığında veri bulunamadı!")
                     return
                 
-                # Analiz sonuçlarını göster
-                st.subheader("Analiz Sonuçları")
-                
                 if 'tevkifat_riski' not in df.columns:
+                    st.subheader("Analiz Sonuçları")
                     st.error("Analiz sonuçları oluşturulamadı. Lütfen veriyi tekrar yükleyin.")
                     return
                     
                 # Tevkifat riski olan faturaları filtrele
                 riskli_faturalar = df[df['tevkifat_riski'] == True].copy()
                 
-                if not riskli_faturalar.empty:
-                    try:
-                        # Sütun isimlerini string olarak birleştir ve tekrar edenleri kaldır
-                        riskli_faturalar.columns = [str(''.join(col)) if isinstance(col, tuple) else str(col) 
-                                                  for col in riskli_faturalar.columns]
-                        
-                        # Tekrarlanan sütunları kaldır
-                        riskli_faturalar = riskli_faturalar.loc[:, ~riskli_faturalar.columns.duplicated()]
-                        
-                        # Analiz sütunlarını tanımla
-                        analiz_sutunlari = ['Risk Seviyesi', 'Risk Skoru', 'Eşleşen Kategoriler']
-                        temel_sutunlar = ['satici_unvani', 'fatura_no', 'tarih', 'aciklama', 'tutar']
-                        mevcut_sutunlar = riskli_faturalar.columns.tolist()
-                        
-                        # Analiz sütunlarını ve tevkifat_riski sütununu çıkar
-                        diger_sutunlar = [col for col in mevcut_sutunlar 
-                                        if col not in analiz_sutunlari + ['tevkifat_riski'] and 
-                                        col.lower() not in [s.lower() for s in temel_sutunlar]]
-                        
-                        # Temel sütunları ekle (eğer varsa)
-                        temel_mevcut_sutunlar = [col for col in mevcut_sutunlar 
-                                               if col.lower() in [s.lower() for s in temel_sutunlar]]
-                        
-                        # Sadece mevcut olan analiz sütunlarını ekle
-                        mevcut_analiz_sutunlari = [col for col in analiz_sutunlari 
-                                                 if col in mevcut_sutunlar]
-                        
-                        # Yeni sütun sırasını oluştur
-                        yeni_sutun_sirasi = temel_mevcut_sutunlar + diger_sutunlar + mevcut_analiz_sutunlari
-                        
-                        # Sütunları yeniden düzenle
-                        riskli_faturalar = riskli_faturalar[yeni_sutun_sirasi]
-                        
-                        # Risk seviyesine göre renklendirme
-                        def risk_rengi(df):
-                            if 'Risk Seviyesi' not in df.columns:
-                                return df
-                            
-                            # Boş stil matrisi oluştur
-                            styles = pd.DataFrame('', index=df.index, columns=df.columns)
-                            
-                            # Risk seviyelerine göre stilleri uygula
-                            mask_cok_yuksek = df['Risk Seviyesi'] == 'Çok Yüksek Risk'
-                            mask_yuksek = df['Risk Seviyesi'] == 'Yüksek Risk'
-                            mask_orta = df['Risk Seviyesi'] == 'Orta Risk'
-                            
-                            # Tüm sütunlara stil uygula
-                            for col in df.columns:
-                                styles.loc[mask_cok_yuksek, col] = 'background-color: red; color: white'
-                                styles.loc[mask_yuksek, col] = 'background-color: orange'
-                                styles.loc[mask_orta, col] = 'background-color: yellow'
-                            
-                            return styles
-                        
-                        # Stil uygula ve göster
-                        styled_df = riskli_faturalar.style.apply(risk_rengi, axis=None)
-                        
-                        # Streamlit dataframe gösterimini genişlet
-                        st.dataframe(
-                            styled_df,
-                            use_container_width=True,
-                            height=600
-                        )
-                        
-                        # Tüm sütunları göster seçeneği
-                        if st.checkbox("Tüm veriyi tablo olarak göster"):
-                            st.write("Tüm Veriler:")
-                            st.write(riskli_faturalar.to_html(index=False), unsafe_allow_html=True)
-                        
-                        # Excel'e aktar
-                        output = f"data/{secilen_musteri}/analiz_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-                        
-                        # Excel yazarken sütun genişliklerini ayarla
-                        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                            riskli_faturalar.to_excel(writer, index=False, sheet_name='Analiz')
-                            worksheet = writer.sheets['Analiz']
-                            
-                            # Excel sütun genişliklerini ayarla
-                            for idx, col in enumerate(riskli_faturalar.columns):
-                                # Excel sütun harfini hesapla (A, B, C, ... , Z, AA, AB, ...)
-                                col_letter = ''
-                                temp = idx
-                                while temp >= 0:
-                                    col_letter = chr(65 + (temp % 26)) + col_letter
-                                    temp = (temp // 26) - 1
-                                
-                                # Sütun genişliğini ayarla
-                                max_length = max(
-                                    riskli_faturalar[col].astype(str).apply(len).max(),
-                                    len(str(col))
-                                ) + 2
-                                worksheet.column_dimensions[col_letter].width = min(max_length, 50)
-                        
-                        # İndirme butonu
-                        with open(output, 'rb') as f:
-                            st.download_button(
-                                label="Analiz Sonuçlarını İndir",
-                                data=f,
-                                file_name=f"tevkifat_analizi_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                            )
-                    except Exception as e:
-                        st.error(f"Stil uygulama hatası: {str(e)}")
-                        # Hata durumunda stili olmadan göster
-                        st.dataframe(riskli_faturalar, use_container_width=True)
-                else:
+                if riskli_faturalar.empty:
+                    st.subheader("Analiz Sonuçları")
                     st.info("Seçilen tarih aralığında tevkifat riski olan fatura bulunamadı.")
+                    return
+                
+                # Sütun isimlerini string olarak birleştir ve tekrar edenleri kaldır
+                riskli_faturalar.columns = [str(''.join(col)) if isinstance(col, tuple) else str(col) 
+                                          for col in riskli_faturalar.columns]
+                
+                # Tekrarlanan sütunları kaldır
+                riskli_faturalar = riskli_faturalar.loc[:, ~riskli_faturalar.columns.duplicated()]
+                
+                # Analiz sütunlarını tanımla
+                analiz_sutunlari = ['Risk Seviyesi', 'Risk Skoru', 'Eşleşen Kategoriler']
+                temel_sutunlar = ['satici_unvani', 'fatura_no', 'tarih', 'aciklama', 'tutar']
+                mevcut_sutunlar = riskli_faturalar.columns.tolist()
+                
+                # Analiz sütunlarını ve tevkifat_riski sütununu çıkar
+                diger_sutunlar = [col for col in mevcut_sutunlar 
+                                if col not in analiz_sutunlari + ['tevkifat_riski'] and 
+                                col.lower() not in [s.lower() for s in temel_sutunlar]]
+                
+                # Temel sütunları ekle (eğer varsa)
+                temel_mevcut_sutunlar = [col for col in mevcut_sutunlar 
+                                       if col.lower() in [s.lower() for s in temel_sutunlar]]
+                
+                # Sadece mevcut olan analiz sütunlarını ekle
+                mevcut_analiz_sutunlari = [col for col in analiz_sutunlari 
+                                         if col in mevcut_sutunlar]
+                
+                # Yeni sütun sırasını oluştur
+                yeni_sutun_sirasi = temel_mevcut_sutunlar + diger_sutunlar + mevcut_analiz_sutunlari
+                
+                # Sütunları yeniden düzenle
+                riskli_faturalar = riskli_faturalar[yeni_sutun_sirasi]
+                
+                # Excel'e aktar
+                output = f"data/{secilen_musteri}/analiz_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+                
+                # Excel yazarken sütun genişliklerini ayarla
+                with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                    riskli_faturalar.to_excel(writer, index=False, sheet_name='Analiz')
+                    worksheet = writer.sheets['Analiz']
+                    
+                    # Excel sütun genişliklerini ayarla
+                    for idx, col in enumerate(riskli_faturalar.columns):
+                        # Excel sütun harfini hesapla (A, B, C, ... , Z, AA, AB, ...)
+                        col_letter = ''
+                        temp = idx
+                        while temp >= 0:
+                            col_letter = chr(65 + (temp % 26)) + col_letter
+                            temp = (temp // 26) - 1
+                        
+                        # Sütun genişliğini ayarla
+                        max_length = max(
+                            riskli_faturalar[col].astype(str).apply(len).max(),
+                            len(str(col))
+                        ) + 2
+                        worksheet.column_dimensions[col_letter].width = min(max_length, 50)
+                
+                # Sonuçları sakla; tablo ve fatura detayı sonraki rerun'larda da gösterilir
+                st.session_state['analiz_detay'] = {
+                    'musteri': secilen_musteri,
+                    'df': riskli_faturalar,
+                    'output': output,
+                    'aciklama_sutunu': next(
+                        (col for col in riskli_faturalar.columns
+                         if col.lower() in ['aciklama', 'açıklama', 'description']),
+                        None
+                    )
+                }
                     
             except Exception as e:
                 st.error(f"Analiz hatası: {str(e)}")
                 logging.error(f"Analiz hatası: {str(e)}\n{traceback.format_exc()}")
+        
+        detay = st.session_state.get('analiz_detay')
+        if detay and detay['musteri'] == secilen_musteri:
+            _analiz_sonuclarini_goster(analyzer, detay)
     else:
         st.info("Henüz müşteri eklenmemiş.")
\ No newline at end of file